@@ -0,0 +1,362 @@
+"""
+Consumer side of the lidar UDP stream (port 5005).
+
+Decodes the JSON packets sent by rplidar_toTouch.py / rplidar_boot.py into
+NumPy arrays, receiving with recv_into() into buffers allocated once.
+
+    from rplidar_receiver import LidarReceiver
+
+    with LidarReceiver(latest_only=True) as rx:
+        for frame in rx:
+            xs, ys = frame.points["x"], frame.points["y"]
+
+Interfaces:
+  rx.recv(timeout=None)     blocking, returns a LidarFrame (None on timeout)
+  for frame in rx: ...      iterator, runs until rx.close()
+  await rx.recv_async()     asyncio, also `async for frame in rx`
+
+latest_only=True drains every datagram already queued in the socket and
+decodes only the newest one, so a slow consumer skips stale frames instead
+of falling further behind. Skipped frames are counted in rx.stats.
+Datagrams that are not lidar packets (no "points" key, e.g. text from the
+UDP panel) never replace a queued frame. A newest packet that looks like a
+lidar packet but fails to decode still loses the batch: it counts in
+stats.errors and the frames dropped for it stay in stats.skipped.
+
+Bad packets are counted in rx.stats.errors and logged at DEBUG level on the
+"rplidar_receiver" logger.
+
+frame.points is a view on the receiver's own array and is overwritten by the
+next recv: call frame.copy() to keep it.
+"""
+import asyncio
+import errno
+import json
+import logging
+import math
+import socket
+import time
+from operator import itemgetter
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+log = logging.getLogger("rplidar_receiver")
+
+# -----------------------------
+# UDP config
+# -----------------------------
+UDP_BIND_IP = ""
+UDP_PORT = 5005
+RECV_BUF_BYTES = 65536          # > max UDP payload (65507), never truncates
+
+# Columns absent from a packet (d_mm / a_deg in toTouch mode) are NaN.
+POINT_DTYPE = np.dtype([
+    ("x", np.float32),
+    ("y", np.float32),
+    ("d_mm", np.float32),
+    ("a_deg", np.float32),
+])
+INITIAL_POINT_CAPACITY = 1024
+ITER_POLL_S = 0.5
+
+_JSON = json.JSONDecoder()
+_GET_X = itemgetter("x")
+_GET_Y = itemgetter("y")
+_PACKET_MARKER = b'"points"'
+_POINTS_OPEN = b'"points": ['
+_XY_OPEN = b'{"x": '
+
+
+class LidarFrame(NamedTuple):
+    t: float            # sender timestamp (time.time())
+    seq: int            # sweep index (rplidar_boot) or decoded frame counter
+    roi_w: float        # ROI width in mm
+    roi_d: float        # ROI depth in mm
+    points: np.ndarray  # POINT_DTYPE, normalized x/y in 0..1
+
+    def copy(self) -> "LidarFrame":
+        return self._replace(points=self.points.copy())
+
+
+class ReceiverStats:
+    __slots__ = ("received", "decoded", "skipped", "errors")
+
+    def __init__(self):
+        self.received = 0   # datagrams read from the socket
+        self.decoded = 0    # frames handed to the consumer
+        self.skipped = 0    # stale frames dropped by latest_only
+        self.errors = 0     # datagrams that failed to decode
+
+    def __repr__(self):
+        return (f"ReceiverStats(received={self.received}, decoded={self.decoded}, "
+                f"skipped={self.skipped}, errors={self.errors})")
+
+
+class LidarReceiver:
+    def __init__(self, ip: str = UDP_BIND_IP, port: int = UDP_PORT,
+                 latest_only: bool = False, reuse_port: bool = False,
+                 rcvbuf: Optional[int] = None):
+        self.latest_only = latest_only
+        self.stats = ReceiverStats()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port and hasattr(socket, "SO_REUSEPORT"):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if rcvbuf:
+            # Larger kernel queue drops fewer packets but lets more go stale
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((ip, port))
+
+        # _buf holds the datagram to decode, _spare takes drained ones
+        self._buf = bytearray(RECV_BUF_BYTES)
+        self._spare = bytearray(RECV_BUF_BYTES)
+        self._points = np.empty(INITIAL_POINT_CAPACITY, dtype=POINT_DTYPE)
+        self._pending = None    # (loop, future) of the in-flight async recv
+        self._closed = False
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    # -----------------------------
+    # Receive
+    # -----------------------------
+    def _drain(self, nbytes: int) -> int:
+        """Read every queued datagram, keep the newest lidar packet in _buf."""
+        have_packet = self._buf.find(_PACKET_MARKER, 0, nbytes) >= 0
+        # With a timeout set, Python polls before each recv: go non-blocking
+        timeout = self.sock.gettimeout()
+        self.sock.setblocking(False)
+        try:
+            while True:
+                try:
+                    n = self.sock.recv_into(self._spare)
+                except (BlockingIOError, InterruptedError):
+                    return nbytes
+                self.stats.received += 1
+                if self._spare.find(_PACKET_MARKER, 0, n) < 0:
+                    self.stats.errors += 1
+                    continue
+                if have_packet:
+                    self.stats.skipped += 1
+                else:
+                    self.stats.errors += 1
+                self._buf, self._spare = self._spare, self._buf
+                nbytes = n
+                have_packet = True
+        finally:
+            self.sock.settimeout(timeout)
+
+    def recv(self, timeout: Optional[float] = None) -> Optional[LidarFrame]:
+        """Block until a frame decodes; None if `timeout` seconds pass first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                self.sock.settimeout(None)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.sock.settimeout(remaining)
+            try:
+                n = self.sock.recv_into(self._buf)
+            except socket.timeout:
+                return None
+            frame = self._handle(n)
+            if frame is not None:
+                return frame
+
+    async def recv_async(self) -> LidarFrame:
+        """Await the next decoded frame; OSError once close() is called."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._closed:
+                raise OSError(errno.EBADF, "receiver closed")
+            self.sock.setblocking(False)
+            # Own task so close() can cancel it: closing the fd does not wake it
+            fut = asyncio.ensure_future(loop.sock_recv_into(self.sock, self._buf))
+            self._pending = (loop, fut)
+            try:
+                n = await fut
+            except asyncio.CancelledError:
+                if self._closed:
+                    raise OSError(errno.EBADF, "receiver closed") from None
+                raise
+            finally:
+                self._pending = None
+            frame = self._handle(n)
+            if frame is not None:
+                return frame
+
+    def _handle(self, n: int) -> Optional[LidarFrame]:
+        self.stats.received += 1
+        if self.latest_only:
+            n = self._drain(n)
+        try:
+            frame = self._decode(n)
+        except Exception as e:
+            # Anything on the port can land here, including deeply nested JSON
+            self.stats.errors += 1
+            log.debug("bad packet: %r", e)
+            return None
+        self.stats.decoded += 1
+        return frame
+
+    # -----------------------------
+    # Decode
+    # -----------------------------
+    def _decode(self, n: int) -> LidarFrame:
+        fast = self._decode_xy_fast(n)
+        if fast is not None:
+            msg, values = fast
+            out = self._point_rows(len(values) // 2)
+            out["x"] = values[0::2]
+            out["y"] = values[1::2]
+            out["d_mm"] = math.nan
+            out["a_deg"] = math.nan
+        else:
+            msg = _JSON.decode(str(memoryview(self._buf)[:n], "utf-8"))
+            if not isinstance(msg, dict):
+                raise ValueError("packet is not a JSON object")
+            pts = msg["points"]
+            count = len(pts)
+            out = self._point_rows(count)
+            if count:
+                out["x"] = np.fromiter(map(_GET_X, pts), np.float32, count)
+                out["y"] = np.fromiter(map(_GET_Y, pts), np.float32, count)
+                keys = set().union(*pts)
+                for key in ("d_mm", "a_deg"):
+                    if key in keys:
+                        out[key] = np.fromiter((p.get(key, math.nan) for p in pts), np.float32, count)
+                    else:
+                        out[key] = math.nan
+
+        # rplidar_toTouch: "roi": {"w", "d"} / rplidar_boot: "roi_mm": {"width", "depth"}
+        roi = msg.get("roi")
+        roi_mm = msg.get("roi_mm")
+        if roi is not None:
+            if not isinstance(roi, dict):
+                raise ValueError("roi is not an object")
+            roi_w, roi_d = roi.get("w", math.nan), roi.get("d", math.nan)
+        elif roi_mm is not None:
+            if not isinstance(roi_mm, dict):
+                raise ValueError("roi_mm is not an object")
+            roi_w, roi_d = roi_mm.get("width", math.nan), roi_mm.get("depth", math.nan)
+        else:
+            roi_w = roi_d = math.nan
+
+        seq = msg.get("sweep", self.stats.decoded)
+        return LidarFrame(float(msg.get("t", 0.0)), int(seq), float(roi_w), float(roi_d), out)
+
+    def _point_rows(self, count: int) -> np.ndarray:
+        if count > len(self._points):
+            self._points = np.empty(max(count, 2 * len(self._points)), dtype=POINT_DTYPE)
+        return self._points[:count]
+
+    def _decode_xy_fast(self, n: int):
+        """
+        Fast path for toTouch packets: "points" holds only {"x": .., "y": ..}
+        objects as written by json.dumps. The array is parsed as a flat list
+        of numbers instead of one dict per point; the rest of the packet goes
+        through json. Returns (msg, values) or None for the general path.
+        """
+        buf = self._buf
+        # Without escapes, '"points": [' can't hide inside a string
+        if buf.find(b"\\", 0, n) >= 0:
+            return None
+        start = buf.find(_POINTS_OPEN, 0, n)
+        if start < 0:
+            return None
+        first = start + len(_POINTS_OPEN)
+        end = buf.find(b"]", first, n)
+        if end < 0:
+            return None
+        seg = bytes(memoryview(buf)[first:end])
+        count = seg.count(b"{")
+        if count == 0 or seg.count(_XY_OPEN) != count:
+            return None
+        flat = seg.replace(b'"x": ', b"").replace(b'"y": ', b"").translate(None, b"{}")
+        if b'"' in flat or b":" in flat:
+            return None     # other keys in some point
+        try:
+            values = np.array(flat.split(b","), dtype=np.float32)
+            msg = _JSON.decode(str(memoryview(buf)[:first], "utf-8")
+                               + str(memoryview(buf)[end:n], "utf-8"))
+        except ValueError:
+            return None
+        if len(values) != 2 * count or not isinstance(msg, dict) or msg.get("points") != []:
+            return None
+        if not np.isfinite(values).all():
+            return None     # overflow / Infinity: same outcome as the general path
+        return msg, values
+
+    # -----------------------------
+    # Iteration / lifecycle
+    # -----------------------------
+    def __iter__(self):
+        while not self._closed:
+            try:
+                # Short timeout so close() from another thread ends the loop
+                frame = self.recv(timeout=ITER_POLL_S)
+            except OSError:
+                if self._closed:
+                    return
+                raise
+            if frame is not None:
+                yield frame
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> LidarFrame:
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            return await self.recv_async()
+        except OSError:
+            if self._closed:
+                raise StopAsyncIteration
+            raise
+
+    def close(self):
+        """Close the socket; ends iteration, including a pending recv_async."""
+        if self._closed:
+            return
+        self._closed = True
+        pending = self._pending
+        if pending is not None:
+            loop, fut = pending
+            try:
+                loop.call_soon_threadsafe(fut.cancel)
+            except RuntimeError:
+                pass    # loop already closed
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -----------------------------
+# Main
+# -----------------------------
+def main():
+    with LidarReceiver(latest_only=True) as rx:
+        print(f"UDP Receiver : listening on {rx.address}", flush=True)
+        try:
+            for frame in rx:
+                if rx.stats.decoded % 60 == 0:
+                    print(f"UDP Receiver : frame {frame.seq} points={len(frame.points)} {rx.stats}", flush=True)
+        except KeyboardInterrupt:
+            print("\nStopped.", flush=True)
+
+
+if __name__ == "__main__":
+    main()
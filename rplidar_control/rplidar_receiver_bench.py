@@ -0,0 +1,252 @@
+"""
+Throughput benchmark for rplidar_receiver.py against a local sender.
+
+A sender process replays rplidar_toTouch-style packets to 127.0.0.1 as fast
+as it can (or at --hz), while the main process consumes them with:
+  json       baseline: recvfrom() + json.loads + dict-per-point loop
+  blocking   LidarReceiver.recv()
+  latest     LidarReceiver(latest_only=True), with --work-ms of fake work
+  asyncio    LidarReceiver.recv_async()
+
+    python rplidar_receiver_bench.py --points 600 --seconds 3
+    python rplidar_receiver_bench.py --check    # malformed packets, latest_only, close
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import random
+import socket
+import time
+
+from rplidar_receiver import LidarReceiver
+
+BENCH_PORT = 5015
+
+
+# -----------------------------
+# Sender (separate process)
+# -----------------------------
+def make_payload(n_points: int, seq: int) -> bytes:
+    """Packet body without "t", stamped by stamp() at send time."""
+    rnd = random.Random(seq)
+    points = [{"x": round(rnd.random(), 4), "y": round(rnd.random(), 4)} for _ in range(n_points)]
+    payload = {
+        "type": "lidar_points",
+        "count": len(points),
+        "points": points,
+        "roi": {"w": 1000, "d": 1000},
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def stamp(body: bytes) -> bytes:
+    return b'{"t": ' + repr(time.time()).encode() + b", " + body[1:]
+
+
+def sender(port: int, n_points: int, seconds: float, hz: float, ready):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packets = [make_payload(n_points, i) for i in range(16)]
+    period = 1.0 / hz if hz > 0 else 0.0
+    ready.wait()
+
+    sent = 0
+    start = time.perf_counter()
+    next_send = start
+    while time.perf_counter() - start < seconds:
+        try:
+            sock.sendto(stamp(packets[sent % len(packets)]), ("127.0.0.1", port))
+            sent += 1
+        except OSError:
+            pass
+        if period:
+            next_send += period
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    sock.close()
+
+
+# -----------------------------
+# Consumers
+# -----------------------------
+# Each consumer binds, then sets `ready` to start the sender, and times its
+# window from there.
+def consume_json(port: int, seconds: float, work_s: float, ready):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", port))
+    sock.settimeout(0.2)
+    frames = points = 0
+    age = 0.0
+    ready.set()
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        try:
+            data, _addr = sock.recvfrom(65536)
+        except socket.timeout:
+            continue
+        msg = json.loads(data.decode("utf-8"))
+        pts = [(p["x"], p["y"]) for p in msg["points"]]
+        frames += 1
+        points += len(pts)
+        age += time.time() - msg["t"]
+        if work_s:
+            time.sleep(work_s)
+    elapsed = time.perf_counter() - start
+    sock.close()
+    return frames, points, age, elapsed, None
+
+
+def consume_receiver(port: int, seconds: float, work_s: float, ready, latest_only: bool):
+    frames = points = 0
+    age = 0.0
+    with LidarReceiver("127.0.0.1", port, latest_only=latest_only) as rx:
+        ready.set()
+        start = time.perf_counter()
+        end = start + seconds
+        while time.perf_counter() < end:
+            frame = rx.recv(timeout=0.2)
+            if frame is None:
+                continue
+            frames += 1
+            points += len(frame.points)
+            age += time.time() - frame.t
+            if work_s:
+                time.sleep(work_s)
+        return frames, points, age, time.perf_counter() - start, rx.stats
+
+
+def consume_asyncio(port: int, seconds: float, work_s: float, ready):
+    async def run():
+        frames = points = 0
+        age = 0.0
+        with LidarReceiver("127.0.0.1", port) as rx:
+            ready.set()
+            start = time.perf_counter()
+            end = start + seconds
+            while time.perf_counter() < end:
+                try:
+                    frame = await asyncio.wait_for(rx.recv_async(), 0.2)
+                except asyncio.TimeoutError:
+                    continue
+                frames += 1
+                points += len(frame.points)
+                age += time.time() - frame.t
+                if work_s:
+                    await asyncio.sleep(work_s)
+            return frames, points, age, time.perf_counter() - start, rx.stats
+
+    return asyncio.run(run())
+
+
+CONSUMERS = {
+    "json": lambda port, s, w, r: consume_json(port, s, w, r),
+    "blocking": lambda port, s, w, r: consume_receiver(port, s, w, r, latest_only=False),
+    "latest": lambda port, s, w, r: consume_receiver(port, s, w, r, latest_only=True),
+    "asyncio": lambda port, s, w, r: consume_asyncio(port, s, w, r),
+}
+
+
+# -----------------------------
+# Malformed packet check
+# -----------------------------
+# Valid JSON that is not a lidar packet must only bump stats.errors, never
+# escape recv() (port 5005 also receives free-form text from the UDP panel).
+MALFORMED_PACKETS = [
+    b"hello from the UDP panel",
+    b"[1, 2, 3]",
+    b'{"roi": [1, 2], "points": []}',
+    b'{"roi_mm": [1], "points": []}',
+    b'{"sweep": Infinity, "points": []}',
+    b'{"points": [{"x": 1' + b"0" * 400 + b', "y": 0.5}]}',
+    b'{"points": [1, 2]}',
+    b'{"points": {"x": 0.1}}',
+    b"[" * 30000,
+    b'{"points": [{"x": 0.1, "y": 0.2}, {"x": 0.3}]}',
+]
+VALID_PACKET = (b'{"t": 1.0, "roi": {"w": 1000, "d": 1000}, '
+                b'"points": [{"x": 0.25, "y": 0.5}, {"x": 0.5, "y": 0.75, "d_mm": 420}]}')
+
+
+def check_malformed() -> None:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    with LidarReceiver("127.0.0.1", BENCH_PORT) as rx:
+        for bad in MALFORMED_PACKETS:
+            sock.sendto(bad, ("127.0.0.1", BENCH_PORT))
+            assert rx.recv(timeout=0.2) is None, bad
+            sock.sendto(bad, ("127.0.0.1", BENCH_PORT))
+            sock.sendto(VALID_PACKET, ("127.0.0.1", BENCH_PORT))
+            frame = rx.recv(timeout=1.0)
+            assert frame is not None and len(frame.points) == 2, bad
+            # d_mm decoded even though only the second point carries it
+            assert frame.points["d_mm"][1] == 420.0, bad
+        assert rx.stats.errors == 2 * len(MALFORMED_PACKETS), rx.stats
+        assert rx.stats.decoded == len(MALFORMED_PACKETS), rx.stats
+    print(f"Check : {len(MALFORMED_PACKETS)} malformed packets rejected, {rx.stats}", flush=True)
+
+    # latest_only: panel text queued after a frame must not replace it
+    with LidarReceiver("127.0.0.1", BENCH_PORT, latest_only=True) as rx:
+        sock.sendto(VALID_PACKET, ("127.0.0.1", BENCH_PORT))
+        sock.sendto(b"hello from the UDP panel", ("127.0.0.1", BENCH_PORT))
+        time.sleep(0.05)
+        frame = rx.recv(timeout=1.0)
+        assert frame is not None and len(frame.points) == 2, rx.stats
+        assert rx.stats.errors == 1 and rx.stats.skipped == 0, rx.stats
+    sock.close()
+    print(f"Check : latest_only keeps the frame queued before panel text, {rx.stats}", flush=True)
+
+    # close() ends a pending `async for`
+    async def iterate_until_closed():
+        with LidarReceiver("127.0.0.1", BENCH_PORT) as rx:
+            asyncio.get_running_loop().call_later(0.2, rx.close)
+            async for _frame in rx:
+                pass
+
+    asyncio.run(asyncio.wait_for(iterate_until_closed(), 2.0))
+    print("Check : close() ends async iteration", flush=True)
+
+
+# -----------------------------
+# Main
+# -----------------------------
+def run_one(mode: str, args) -> None:
+    ready = mp.Event()
+    proc = mp.Process(target=sender, args=(BENCH_PORT, args.points, args.seconds, args.hz, ready))
+    proc.start()
+    try:
+        result = CONSUMERS[mode](BENCH_PORT, args.seconds, args.work_ms / 1000.0, ready)
+    finally:
+        ready.set()  # never leave the sender waiting if the consumer failed to bind
+        proc.join()
+
+    frames, points, age, elapsed, stats = result
+    fps = frames / elapsed
+    age_ms = 1000.0 * age / frames if frames else 0.0
+    extra = f"  {stats}" if stats is not None else ""
+    print(f"{mode:>8} : {fps:9.1f} frames/s  {points / elapsed / 1e6:6.2f} Mpts/s  "
+          f"age {age_ms:7.1f} ms{extra}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=600, help="points per packet (MAX_POINTS in toTouch)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--hz", type=float, default=0.0, help="sender rate, 0 = as fast as possible")
+    parser.add_argument("--work-ms", type=float, default=0.0, help="simulated consumer work per frame")
+    parser.add_argument("--modes", default=",".join(CONSUMERS), help="comma separated: " + ",".join(CONSUMERS))
+    parser.add_argument("--check", action="store_true", help="only run the receiver checks (malformed packets, latest_only, close)")
+    args = parser.parse_args()
+
+    if args.check:
+        check_malformed()
+        return
+
+    print(f"Bench : {args.points} points/packet, {args.seconds}s per mode, "
+          f"sender {'max rate' if args.hz <= 0 else f'{args.hz} Hz'}, work {args.work_ms} ms", flush=True)
+    for mode in args.modes.split(","):
+        run_one(mode.strip(), args)
+
+
+if __name__ == "__main__":
+    main()